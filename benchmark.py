@@ -0,0 +1,171 @@
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from solver import STRATEGIES, WordleSolver
+
+DEFAULT_ANSWER_FILES = ['lists/answers.txt', 'lists/test_answers.txt']
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+# Timings only mean something on the machine that recorded them, so they live
+# in their own file that is never committed
+DEFAULT_TIMES = 'benchmark_times.json'
+# Fields stored in the committed baseline, the same on every machine
+QUALITY_FIELDS = ['answers', 'strategy', 'answer_count', 'average_depth', 'worst_depth', 'failures', 'nodes']
+TIME_FIELDS = ['wall_time', 'cpu_time', 'time_per_node', 'peak_rss_kb', 'worker_rss_kb']
+# Absolute wall time slack so sub-second cases don't fail on timer noise
+TIME_SLACK = 0.25
+
+def get_answer_depths(solver: WordleSolver, tree) -> list[int]:
+    # Plays every answer through the tree, 0 means the tree never solves it
+    depths = []
+    for answer in solver.root_answers.tolist():
+        history, solved = solver.play(tree, answer)
+        depths.append(len(history) if solved else 0)
+    return depths
+
+def run_case(answers_file: str, strategy: str, workers: int, maxdepth: int) -> dict:
+    # Runs in its own process so peak RSS belongs to this case alone
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    solver = WordleSolver(answers_file=answers_file, strategy=strategy, workers=workers, maxdepth=maxdepth)
+    with contextlib.redirect_stdout(io.StringIO()):
+        with solver:
+            tree = solver.recursive_check()
+
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start + resource.getrusage(resource.RUSAGE_CHILDREN).ru_utime
+    depths = get_answer_depths(solver, tree)
+    solved = [depth for depth in depths if depth > 0]
+    nodes = len(tree.node_words)
+
+    return {
+        'answers': answers_file,
+        'strategy': strategy,
+        'answer_count': len(depths),
+        'average_depth': sum(solved) / len(solved) if solved else 0.0,
+        'worst_depth': max(solved, default=0),
+        'failures': sum(1 for depth in depths if depth == 0 or depth > 6),
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'nodes': nodes,
+        'time_per_node': wall_time / nodes,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        # Largest pool worker, they are all joined once the solve is done
+        'worker_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+def case_key(case: dict) -> str:
+    return f"{case['answers']}:{case['strategy']}"
+
+def find_regressions(cases: list[dict], baseline: dict, times: dict, time_tolerance: float) -> list[str]:
+    regressions = []
+    for case in cases:
+        expected = baseline.get(case_key(case))
+        if expected is not None:
+            if round(case['average_depth'], 6) > round(expected['average_depth'], 6):
+                regressions.append(f"{case_key(case)}: average depth {case['average_depth']:.4f} > {expected['average_depth']:.4f}")
+            if case['failures'] > expected['failures']:
+                regressions.append(f"{case_key(case)}: failures {case['failures']} > {expected['failures']}")
+        expected = times.get(case_key(case))
+        if expected is not None and case['wall_time'] > expected['wall_time'] * (1 + time_tolerance) + TIME_SLACK:
+            regressions.append(f"{case_key(case)}: wall time {case['wall_time']:.2f}s > {expected['wall_time']:.2f}s "
+                               f"+ {time_tolerance:.0%}")
+    return regressions
+
+def print_table(cases: list[dict]):
+    print("Answers                  | Strategy | Avg    | Worst | Fail | Wall (s) | CPU (s) | ms/node | Peak RSS (MB) | Worker RSS (MB)")
+    print("-------------------------|----------|--------|-------|------|----------|---------|---------|---------------|----------------")
+    for case in cases:
+        print(f"{case['answers']:24s} | {case['strategy']:8s} | {case['average_depth']:6.4f} | {case['worst_depth']:5d} | "
+              f"{case['failures']:4d} | {case['wall_time']:8.2f} | {case['cpu_time']:7.2f} | "
+              f"{case['time_per_node'] * 1000:7.3f} | {case['peak_rss_kb'] / 1024:13.1f} | {case['worker_rss_kb'] / 1024:15.1f}")
+
+def load_results(path: str) -> dict:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def update_results(path: str, cases: list[dict], fields: list[str]):
+    results = load_results(path)
+    results.update({case_key(case): {field: case[field] for field in fields} for case in cases})
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Wordle Solver benchmark')
+    parser.add_argument('-strategies', '--strategies', default='buckets',
+                      help=f"Comma separated strategies to run, or 'all' (default: buckets). "
+                           f"Available: {', '.join(STRATEGIES)}")
+    parser.add_argument('-answers', '--answers', nargs='+', default=DEFAULT_ANSWER_FILES,
+                      help='Answer lists to solve (default: lists/answers.txt lists/test_answers.txt)')
+    parser.add_argument('-workers', '--workers', type=int, default=1,
+                      help='Worker processes per solve (default: 1)')
+    parser.add_argument('-depth', type=int, default=6,
+                      help='Maximum depth for the solver (default: 6)')
+    parser.add_argument('-output', '--output', dest='output_file',
+                      help='Write the results to this JSON file')
+    parser.add_argument('-baseline', '--baseline', dest='baseline_file', default=DEFAULT_BASELINE,
+                      help=f'Baseline to compare against (default: {DEFAULT_BASELINE})')
+    parser.add_argument('-times', '--times', dest='times_file', default=DEFAULT_TIMES,
+                      help=f'Timings recorded on this machine to compare against (default: {DEFAULT_TIMES})')
+    parser.add_argument('-tolerance', '--time-tolerance', dest='time_tolerance', type=float, default=0.5,
+                      help='Allowed wall time slowdown against the baseline, as a fraction (default: 0.5)')
+    parser.add_argument('-update', '--update-baseline', dest='update_baseline', action='store_true',
+                      help='Store these results as the new baseline and local timings instead of comparing')
+    return parser.parse_args()
+
+def run():
+    args = parse_arguments()
+    strategies = list(STRATEGIES) if args.strategies == 'all' else args.strategies.split(',')
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            print(f"Error: unknown strategy {strategy}")
+            sys.exit(1)
+
+    # A fresh process per case keeps peak RSS and caches independent
+    cases = []
+    context = multiprocessing.get_context('spawn')
+    for answers_file in args.answers:
+        for strategy in strategies:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                cases.append(executor.submit(run_case, answers_file, strategy, args.workers, args.depth).result())
+
+    print_table(cases)
+    results = {'cases': cases}
+    if args.output_file:
+        with open(args.output_file, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output_file}")
+
+    if args.update_baseline:
+        update_results(args.baseline_file, cases, QUALITY_FIELDS)
+        update_results(args.times_file, cases, TIME_FIELDS)
+        print(f"Baseline written to {args.baseline_file}, timings to {args.times_file}")
+        return
+
+    baseline = load_results(args.baseline_file)
+    times = load_results(args.times_file)
+    if not baseline:
+        print(f"No baseline at {args.baseline_file}, depths are not compared")
+    if not times:
+        print(f"No timings at {args.times_file}, wall time is not compared (record them with -update)")
+
+    regressions = find_regressions(cases, baseline, times, args.time_tolerance)
+    if regressions:
+        print("\nRegressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline")
+
+if __name__ == "__main__":
+    run()
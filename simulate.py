@@ -0,0 +1,130 @@
+import io
+import os
+import sys
+import csv
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from solver import STRATEGIES, WordleSolver
+
+# Opener name that lets the solver pick its own first guess
+BEST_OPENER = 'best'
+COLUMNS = ['strategy', 'opener', 'answer', 'guesses', 'trace', 'remaining']
+
+def play_games(solver: WordleSolver, tree) -> list[tuple[str, int, str, str]]:
+    # Plays every answer through the tree. Each game is its answer, the number
+    # of guesses (0 if the tree never solves it), the guess/pattern trace and
+    # how many answers were still possible after each guess.
+    games = []
+    for answer in solver.root_answers.tolist():
+        history, solved = solver.play(tree, answer)
+        remaining = [len(solver.filter_answers(history[:step])) for step in range(1, len(history) + 1)]
+        games.append((solver.answer_words[answer], len(history) if solved else 0,
+                      ' '.join(f"{guess} {pattern}" for guess, pattern in history),
+                      ' '.join(str(count) for count in remaining)))
+    return games
+
+def run_case(answers_file: str, strategy: str, opener: str, maxdepth: int, hard_mode: bool) -> dict:
+    # Builds one tree for this opener and strategy, solving every answer at once
+    solver = WordleSolver(answers_file=answers_file, strategy=strategy, maxdepth=maxdepth, hard_mode=hard_mode,
+                          opener=None if opener == BEST_OPENER else opener, opening_book=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tree = solver.recursive_check()
+
+    games = play_games(solver, tree)
+    return {
+        'strategy': strategy,
+        'opener': tree.guess(0),
+        'answer': [answer for answer, guesses, trace, remaining in games],
+        'guesses': [guesses for answer, guesses, trace, remaining in games],
+        'trace': [trace for answer, guesses, trace, remaining in games],
+        'remaining': [remaining for answer, guesses, trace, remaining in games],
+    }
+
+def print_table(cases: list[dict]):
+    print("Strategy | Opener | Games | Avg    | Worst | Fail | " + " | ".join(f"{depth:4d}" for depth in range(1, 7)))
+    print("---------|--------|-------|--------|-------|------|" + "|".join("------" for depth in range(1, 7)))
+    for case in cases:
+        guesses = np.array(case['guesses'])
+        solved = guesses[(guesses > 0) & (guesses <= 6)]
+        counts = np.bincount(solved, minlength=7)
+        print(f"{case['strategy']:8s} | {case['opener']:6s} | {len(guesses):5d} | "
+              f"{solved.mean() if len(solved) else 0:6.4f} | {solved.max(initial=0):5d} | {len(guesses) - len(solved):4d} | " +
+              " | ".join(f"{count:4d}" for count in counts[1:]))
+
+def write_results(cases: list[dict], path: str):
+    # One row per game; .npz stores each column as an array, anything else is CSV
+    columns = {name: [] for name in COLUMNS}
+    for case in cases:
+        for name in COLUMNS:
+            values = case[name]
+            columns[name].extend(values if isinstance(values, list) else [values] * len(case['answer']))
+
+    if path.endswith('.npz'):
+        np.savez_compressed(path, **{name: np.array(values) for name, values in columns.items()})
+        return
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(zip(*columns.values()))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Wordle Solver game simulation')
+    parser.add_argument('-openers', '--openers', default=BEST_OPENER,
+                      help=f"Comma separated first guesses to force, '{BEST_OPENER}' lets the solver pick "
+                           f"(default: {BEST_OPENER})")
+    parser.add_argument('-strategies', '--strategies', default='buckets',
+                      help=f"Comma separated strategies to run, or 'all' (default: buckets). "
+                           f"Available: {', '.join(STRATEGIES)}")
+    parser.add_argument('-answers', '--answers', default='lists/answers.txt',
+                      help='Answer list to play (default: lists/answers.txt)')
+    parser.add_argument('-processes', '--processes', type=int, default=os.cpu_count(),
+                      help='Opener and strategy combinations solved at once (default: CPU count)')
+    parser.add_argument('-depth', type=int, default=6,
+                      help='Maximum depth for the solver (default: 6)')
+    parser.add_argument('-hard', '--hard-mode', dest='hard_mode', action='store_true',
+                      help='Only play guesses consistent with all earlier feedback')
+    parser.add_argument('-output', '--output', dest='output_file', default='games.csv',
+                      help='Write one row per game to this .csv or .npz file (default: games.csv)')
+    return parser.parse_args()
+
+def run():
+    args = parse_arguments()
+    strategies = list(STRATEGIES) if args.strategies == 'all' else args.strategies.split(',')
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            print(f"Error: unknown strategy {strategy}")
+            sys.exit(1)
+    if args.processes <= 0:
+        print("Error: Processes must be a positive integer")
+        sys.exit(1)
+
+    openers = [opener.lower() for opener in args.openers.split(',')]
+    solver = WordleSolver(answers_file=args.answers)
+    for opener in openers:
+        if opener != BEST_OPENER and opener not in solver.guess_index:
+            print(f"Error: opener {opener} is not in combined.txt")
+            sys.exit(1)
+
+    # Build the matrix cache first so the processes only ever load the file
+    solver.feedback
+
+    # Every combination builds its own tree, so they spread over processes with
+    # no shared state
+    combinations = [(opener, strategy) for opener in openers for strategy in strategies]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(args.processes, len(combinations)), mp_context=context) as executor:
+        futures = [executor.submit(run_case, args.answers, strategy, opener, args.depth, args.hard_mode)
+                   for opener, strategy in combinations]
+        cases = [future.result() for future in futures]
+
+    print_table(cases)
+    write_results(cases, args.output_file)
+    print(f"{sum(len(case['answer']) for case in cases)} games written to {args.output_file}")
+
+if __name__ == "__main__":
+    run()
@@ -1,16 +1,50 @@
+import os
 import re
 import sys
+import json
+import mmap
+import hashlib
+import time
 import argparse
+import contextlib
 import multiprocessing
-from functools import partial
+import itertools
+from functools import cached_property, lru_cache
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+# Feedback patterns are stored as base-3 codes: B=0, Y=1, G=2, with the
+# colour of letter i weighted by 3**i.
+PATTERN_COUNT = 243
+ALL_GREEN = PATTERN_COUNT - 1
+PATTERN_COLOURS = 'BYG'
+
+# Word and answer indices fit in 16 bits, which keeps buckets compact
+INDEX_DTYPE = np.uint16
+
+# Total guess counts at or above this are never worth exploring
+NO_SOLUTION = float('inf')
+
+# Candidate count above which the hybrid strategy scores like an opener
+HYBRID_CUTOFF = 1000
+
+# Guesses scored between bound checks in the branch-and-bound scan
+SCAN_BLOCK_SIZE = 1024
+
+# Nodes with at most this many candidates try the fast path in get_best_guess
+FAST_PATH_SIZE = 10
+# Number of strong opening words kept as burner guesses for the fast path
+BURNER_COUNT = 500
+
+# Part of every opening book name. Bump it whenever a code change can pick
+# different guesses, so books saved by older code are no longer used.
+OPENING_BOOK_VERSION = 1
 
 def load_word_list(file_path):
     with open(file_path, 'r') as file:
         return [line.strip() for line in file.readlines()]
 
-# Load word lists
-all_words = load_word_list('lists/combined.txt')
-
 def get_word_score_for_answer(guess: str, answer: str) -> str:
     # Initialize the result with all 'B's (default to not in word)
     result = ['B'] * len(guess)
@@ -36,96 +70,1158 @@ def get_word_score_for_answer(guess: str, answer: str) -> str:
     
     return ''.join(result)
 
-def get_bucket_count(guess : str, possible_answers : list[str]):
-    results = set([])
+def pattern_to_code(pattern: str) -> int:
+    code = 0
+    for i, colour in enumerate(pattern):
+        code += PATTERN_COLOURS.index(colour) * 3 ** i
+    return code
 
-    for answer in possible_answers:
-        results.add(get_word_score_for_answer(guess, answer))
+def code_to_pattern(code: int) -> str:
+    result = []
+    for i in range(5):
+        result.append(PATTERN_COLOURS[code % 3])
+        code //= 3
+    return ''.join(result)
 
-    if guess in possible_answers:
-        return (len(results) + 0.5, guess)
-    
-    #print(f"Bucket count for {guess} = {len(results)}")
-    return (len(results), guess)
-
-def get_best_guess(possible_guesses : list[str], possible_answers : list[str]) -> str:
-    if len(possible_answers) == 0:
-        print("No possible answers")
-        exit()
-
-    if len(possible_answers) == 1:
-        return possible_answers[0]
-
-    worker_func = partial(get_bucket_count, possible_answers=possible_answers)
-
-    with multiprocessing.Pool(processes = 8) as pool:
-        results = pool.map(worker_func, possible_guesses)
-
-    # Find the guess with the maximum bucket count
-    bucket_count, best_guess = max(results)
-    return best_guess
-
-def check_answers_against_guess(guess: str, possible_answers: list[str]) -> dict[str, list[str]]:
-    results = {}
-    for answer in possible_answers:
-        score = get_word_score_for_answer(guess, answer)
-        if score not in results:
-            results[score] = []
-        results[score].append(answer)
-    return results
-
-def recursive_check():
-    layers : list[dict[str, list[str]]] = []
-    solved_data = [0] * (maxdepth + 1)  # Initialize with zeros for each depth
-    for i in range(maxdepth + 1):
-        layers.append({})
-    layers[0][""] = answers
-
-    for d in range(maxdepth):
-        for group in layers[d].keys():
-            best_guess = get_best_guess(all_words, layers[d][group])
-            next_layer = check_answers_against_guess(best_guess, layers[d][group])
-            for result in next_layer.keys():
-                if result == "GGGGG":
-                    print(f"Solution for {next_layer[result][0]}:{group} {best_guess}")
-                    solved_data[d] += 1
+def encode_words(words: list[str]) -> np.ndarray:
+    # One row of 5 ASCII bytes per word
+    return np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8).reshape(-1, 5)
+
+def get_list_hash(guesses: list[str], answers: list[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update('\n'.join(guesses).encode('ascii'))
+    digest.update(b'\0')
+    digest.update('\n'.join(answers).encode('ascii'))
+    return digest.hexdigest()
+
+def build_feedback_matrix(guesses: list[str], answers: list[str], chunk_size: int = 1024) -> np.ndarray:
+    guess_letters = encode_words(guesses)
+    answer_letters = encode_words(answers)[None, :, :]
+    matrix = np.empty((len(guesses), len(answers)), dtype=np.uint8)
+
+    # Same two passes as get_word_score_for_answer, vectorised over a block of guesses
+    for start in range(0, len(guesses), chunk_size):
+        block = guess_letters[start:start + chunk_size, None, :]
+        green = block == answer_letters
+        codes = np.zeros(green.shape[:2], dtype=np.uint8)
+        yellows = []
+        for i in range(5):
+            letter = block[:, :, i:i + 1]
+            # Copies of this letter in the answer that were not matched green
+            available = ((answer_letters == letter) & ~green).sum(axis=2)
+            # Copies already claimed by earlier yellows of the same letter
+            used = np.zeros_like(available)
+            for j in range(i):
+                used += (block[:, :, j] == block[:, :, i]) & yellows[j]
+            yellow = ~green[:, :, i] & (available > used)
+            yellows.append(yellow)
+            codes += (green[:, :, i] * 2 + yellow).astype(np.uint8) * 3 ** i
+        matrix[start:start + chunk_size] = codes
+
+    return matrix
+
+@lru_cache(maxsize=1024)
+def get_attainable_codes(guess: str) -> frozenset[int]:
+    # Every pattern code some five letter string can give this guess. Letters
+    # missing from the guess all score alike, so strings over the guess letters
+    # plus one filler letter cover every case.
+    filler = next(letter for letter in 'abcdefghijklmnopqrstuvwxyz' if letter not in guess)
+    strings = [''.join(letters) for letters in itertools.product(sorted(set(guess)) + [filler], repeat=5)]
+    return frozenset(np.unique(build_feedback_matrix([guess], strings)).tolist())
+
+def load_feedback_matrix(guesses: list[str], answers: list[str], directory: str = 'lists') -> np.ndarray:
+    # The cache file is named after a hash of both lists, so editing either list
+    # simply misses the cache and triggers a rebuild.
+    path = os.path.join(directory, f"feedback-{get_list_hash(guesses, answers)[:16]}.npy")
+    # The matrix is memory-mapped read-only, so every process that loads it
+    # shares the same pages instead of holding its own copy
+    if os.path.exists(path):
+        matrix = np.asarray(np.load(path, mmap_mode='r'))
+        if matrix.shape == (len(guesses), len(answers)):
+            return matrix
+
+    print(f"Building feedback matrix ({len(guesses)} x {len(answers)})")
+    matrix = build_feedback_matrix(guesses, answers)
+    # Each process writes its own temp file, so concurrent builders can't clash
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        np.save(file, matrix)
+    os.replace(temp_path, path)
+    return np.asarray(np.load(path, mmap_mode='r'))
+
+# Decision tree file layout, all little-endian:
+#   magic (8 bytes), node count (uint32), edge count (uint32)
+#   edge_start  uint32[nodes + 1]  edges of node n are edge_start[n]:edge_start[n + 1]
+#   edge_child  int32[edges]       child node, or TREE_SOLVED for the GGGGG edge
+#   node_words  uint8[nodes, 5]    guess played at each node, zeros if unsolved
+#   edge_code   uint8[edges]       pattern code of each edge, sorted within a node
+TREE_MAGIC = b'WTREE001'
+TREE_SOLVED = -1
+
+class DecisionTree:
+    def __init__(self, node_words: np.ndarray, edge_start: np.ndarray, edge_child: np.ndarray, edge_code: np.ndarray):
+        self.node_words = node_words
+        self.edge_start = edge_start
+        self.edge_child = edge_child
+        self.edge_code = edge_code
+
+    @classmethod
+    def from_nodes(cls, node_guesses: list[int], node_edges: list[list[tuple[int, int]]], guess_letters: np.ndarray):
+        # node_guesses holds a guess index per node (-1 if unsolved), node_edges
+        # the (pattern code, child) pairs leaving it
+        node_words = np.zeros((len(node_guesses), 5), dtype=np.uint8)
+        for node, guess in enumerate(node_guesses):
+            if guess >= 0:
+                node_words[node] = guess_letters[guess]
+        edges = [sorted(node) for node in node_edges]
+        edge_start = np.zeros(len(edges) + 1, dtype='<u4')
+        np.cumsum([len(node) for node in edges], out=edge_start[1:])
+        edge_child = np.array([child for node in edges for code, child in node], dtype='<i4')
+        edge_code = np.array([code for node in edges for code, child in node], dtype=np.uint8)
+        return cls(node_words, edge_start, edge_child, edge_code)
+
+    @classmethod
+    def load(cls, path: str):
+        # Memory-maps the file, so loading costs the same for any tree size
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:8] != TREE_MAGIC:
+            raise ValueError(f"{path} is not a decision tree file")
+        node_count, edge_count = np.frombuffer(data, dtype='<u4', count=2, offset=8).tolist()
+        offset = 16
+        edge_start = np.frombuffer(data, dtype='<u4', count=node_count + 1, offset=offset)
+        offset += edge_start.nbytes
+        edge_child = np.frombuffer(data, dtype='<i4', count=edge_count, offset=offset)
+        offset += edge_child.nbytes
+        node_words = np.frombuffer(data, dtype=np.uint8, count=node_count * 5, offset=offset).reshape(-1, 5)
+        offset += node_words.nbytes
+        edge_code = np.frombuffer(data, dtype=np.uint8, count=edge_count, offset=offset)
+        return cls(node_words, edge_start, edge_child, edge_code)
+
+    def save(self, path: str):
+        # Written aside and renamed, so a tree can replace the file it was loaded from
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(TREE_MAGIC)
+            file.write(np.array([len(self.node_words), len(self.edge_code)], dtype='<u4').tobytes())
+            for array in (self.edge_start, self.edge_child, self.node_words, self.edge_code):
+                file.write(np.ascontiguousarray(array).tobytes())
+        os.replace(temp_path, path)
+
+    def guess(self, node: int) -> str | None:
+        word = self.node_words[node].tobytes()
+        return word.decode('ascii') if word[0] else None
+
+    def child(self, node: int, code: int) -> int | None:
+        # Returns the child node, TREE_SOLVED, or None if the pattern never came up
+        start, end = int(self.edge_start[node]), int(self.edge_start[node + 1])
+        position = start + int(np.searchsorted(self.edge_code[start:end], code))
+        if position < end and self.edge_code[position] == code:
+            return int(self.edge_child[position])
+        return None
+
+    def solved_words(self) -> list[str]:
+        # Every answer ends the game at exactly one node, the one whose guess it is
+        positions = np.flatnonzero(self.edge_child == TREE_SOLVED)
+        nodes = np.searchsorted(self.edge_start, positions, side='right') - 1
+        return [self.guess(int(node)) for node in nodes]
+
+    def to_json(self, node: int = 0) -> dict:
+        children = {}
+        for position in range(int(self.edge_start[node]), int(self.edge_start[node + 1])):
+            child = int(self.edge_child[position])
+            children[code_to_pattern(int(self.edge_code[position]))] = None if child == TREE_SOLVED else self.to_json(child)
+        return {'guess': self.guess(node), 'next': children}
+
+# Scoring strategies, one per prototype. Each takes the pattern histograms of a
+# block of guesses (one row of bucket sizes per guess), a mask of which of those
+# guesses are still candidates and the candidate count, and returns one score
+# per guess, higher is better. A guess that puts every candidate in its own
+# bucket must score highest, which the fast path in get_best_guess relies on.
+
+def strategy_buckets(histograms: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # solver.py: most buckets, half a bucket for a possible win
+    return np.count_nonzero(histograms, axis=1) + 0.5 * is_candidate
+
+def strategy_squares(histograms: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # solver3.py: smallest sum of squared bucket sizes, ignoring singles
+    squares = np.where(histograms > 1, histograms * histograms, 0).sum(axis=1)
+    return -(squares - 1.0 * is_candidate)
+
+def strategy_log(histograms: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # solver6.py: each bucket is worth 1 / (log(size) + 0.1)
+    with np.errstate(divide='ignore'):
+        worth = np.where(histograms > 0, 1 / (np.log(np.maximum(histograms, 1)) + 0.1), 0)
+    return worth.sum(axis=1) + 1.0 * is_candidate
+
+def strategy_entropy(histograms: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # solver4.py: information gained, small bias for a possible win
+    p = histograms / n
+    entropy = -np.where(p > 0, p * np.log2(np.where(p > 0, p, 1)), 0).sum(axis=1)
+    return entropy + 0.01 * is_candidate
+
+def strategy_weighted(histograms: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # solver5.py: buckets plus singles, strong bias for a possible win
+    buckets = np.count_nonzero(histograms, axis=1)
+    singles = np.count_nonzero(histograms == 1, axis=1)
+    return buckets + singles + 2.0 * is_candidate
+
+def strategy_hybrid(histograms: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # solver4.py/solver5.py: extra weight on singles for big openers, then weighted
+    if n > HYBRID_CUTOFF:
+        buckets = np.count_nonzero(histograms, axis=1)
+        singles = np.count_nonzero(histograms == 1, axis=1)
+        return buckets + 1.5 * singles + 2.0 * is_candidate
+    return strategy_weighted(histograms, is_candidate, n)
+
+STRATEGIES = {
+    'buckets': strategy_buckets,
+    'squares': strategy_squares,
+    'log': strategy_log,
+    'entropy': strategy_entropy,
+    'weighted': strategy_weighted,
+    'hybrid': strategy_hybrid,
+}
+
+# Upper bounds on each strategy's score, given an upper bound on the number of
+# buckets a guess can produce. The branch-and-bound scan skips every guess whose
+# bound is below the best score found so far.
+
+def bound_buckets(buckets: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    return buckets + 0.5 * is_candidate
+
+def bound_squares(buckets: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # The n - buckets extra answers spread as evenly as possible over
+    # min(buckets, extra) shared buckets give the smallest sum of squares
+    extra = n - buckets
+    shared = np.maximum(np.minimum(buckets, extra), 1)
+    squares = np.where(extra > 0, shared + 2 * extra + extra * extra / shared, 0)
+    return -(squares - 1.0 * is_candidate)
+
+def bound_log(buckets: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    # A single is the most a bucket can be worth
+    return buckets * 10.0 + 1.0 * is_candidate
+
+def bound_entropy(buckets: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    return np.log2(np.maximum(buckets, 1)) + 0.01 * is_candidate
+
+def bound_weighted(buckets: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    return 2 * buckets + 2.0 * is_candidate
+
+def bound_hybrid(buckets: np.ndarray, is_candidate: np.ndarray, n: int) -> np.ndarray:
+    if n > HYBRID_CUTOFF:
+        return 2.5 * buckets + 2.0 * is_candidate
+    return bound_weighted(buckets, is_candidate, n)
+
+STRATEGY_BOUNDS = {
+    'buckets': bound_buckets,
+    'squares': bound_squares,
+    'log': bound_log,
+    'entropy': bound_entropy,
+    'weighted': bound_weighted,
+    'hybrid': bound_hybrid,
+}
+
+# Each pool worker keeps its own solver, created once by init_worker, and views
+# of the index and score arrays it shares with the main process
+worker_solver = None
+worker_indices = None
+worker_scores = None
+
+def init_worker(settings: dict, burner_indices: np.ndarray, shared_indices, shared_scores):
+    # Workers load the lists and map the cached feedback matrix once, so tasks
+    # only carry offsets into the shared arrays. The burners take a full root
+    # scan to find, so they come from the main process instead.
+    global worker_solver, worker_indices, worker_scores
+    worker_solver = WordleSolver(**settings)
+    worker_solver.burner_indices = burner_indices
+    worker_indices = np.frombuffer(shared_indices, dtype=INDEX_DTYPE)
+    worker_scores = np.frombuffer(shared_scores, dtype=np.float64)
+
+def score_guess_block(start: int, stop: int, guess_count: int, answer_count: int):
+    # Guesses start:stop of the shared guess list against the answers after it
+    answer_indices = worker_indices[guess_count:guess_count + answer_count]
+    worker_scores[start:stop] = worker_solver.get_scores(worker_indices[start:stop], answer_indices)
+
+def select_node_guess(task: tuple[int, np.ndarray, np.ndarray | None, int, bool]) -> tuple[int, int, dict | None]:
+    # Solves one whole node, returning its task id with the guess and, when
+    # profiling, the counters of the work done for it
+    task_id, answer_indices, guess_indices, depth, profiling = task
+    worker_solver.profiler = Profiler() if profiling else None
+    guess = worker_solver.select_guess(answer_indices, depth, guess_indices)
+    return task_id, guess, dict(worker_solver.profiler.counters[None]) if profiling else None
+
+class LetterIndex:
+    # Bitmasks over a word list, one bit per word, by letter and position and by
+    # letter count. The words that would give a guess a certain pattern come out
+    # of a few ANDs of these masks instead of scoring every word.
+    def __init__(self, letters: np.ndarray):
+        self.size = len(letters)
+        codes = letters.astype(np.int64) - ord('a')
+        words = np.arange(self.size)
+
+        # at[i, l]: words with letter l at position i
+        at = np.zeros((5, 26, self.size), dtype=bool)
+        for i in range(5):
+            at[i, codes[:, i], words] = True
+        self.at = np.packbits(at, axis=-1, bitorder='little')
+
+        # at_least[l, k]: words with at least k copies of letter l
+        counts = at.sum(axis=0)
+        at_least = counts[:, None, :] >= np.arange(6)[None, :, None]
+        self.at_least = np.packbits(at_least, axis=-1, bitorder='little')
+
+    def consistent(self, guess: np.ndarray, code: int) -> np.ndarray:
+        # Packed mask of the words that give `guess` (5 ASCII letters) this
+        # pattern. The pattern must be one the guess can get at all (see
+        # get_attainable_codes), otherwise words with a different one can match.
+        colours = [(code // 3 ** i) % 3 for i in range(5)]
+        letters = [int(letter) - ord('a') for letter in guess]
+        mask = np.full(self.at.shape[-1], 0xFF, dtype=np.uint8)
+        for i in range(5):
+            if colours[i] == 2:
+                mask &= self.at[i, letters[i]]
+            else:
+                mask &= ~self.at[i, letters[i]]
+
+        # A letter shows up exactly as often as it is coloured if any copy is B,
+        # and at least that often otherwise
+        for letter in set(letters):
+            coloured = sum(1 for i in range(5) if letters[i] == letter and colours[i] > 0)
+            mask &= self.at_least[letter, coloured]
+            if any(letters[i] == letter and colours[i] == 0 for i in range(5)):
+                mask &= ~self.at_least[letter, coloured + 1]
+        return mask
+
+    def unpack(self, mask: np.ndarray) -> np.ndarray:
+        return np.unpackbits(mask, count=self.size, bitorder='little').view(bool)
+
+class CandidateCache:
+    # Bounded LRU cache for results that only depend on the candidate set.
+    # Each solver owns one and scores with a single strategy, so keys only start
+    # with a tag naming the search ('greedy', 'exact' or 'beam') that stored them.
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: tuple):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+class Profiler:
+    # Collects per-depth counters and phase timers while the solver runs, plus
+    # one trace event per phase for chrome://tracing or Perfetto.
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.depth = None
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.timers = defaultdict(lambda: defaultdict(float))
+        self.events = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **details):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timers[self.depth][name] += elapsed
+            self.events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                                'ts': (started - self.start) * 1e6, 'dur': elapsed * 1e6,
+                                'args': dict(details, depth=self.depth)})
+
+    def count(self, name: str, value: int = 1):
+        self.counters[self.depth][name] += value
+
+    def print_summary(self):
+        phases = sorted({name for timers in self.timers.values() for name in timers})
+        depths = sorted(set(self.timers) | set(self.counters), key=lambda depth: -1 if depth is None else depth)
+        print("\n=== Solver Profile ===")
+        print("Depth | Nodes | Candidates | Guesses scored | Guesses pruned | Pattern evals | " + " | ".join(f"{name} (s)" for name in phases))
+        for depth in depths:
+            counters, timers = self.counters[depth], self.timers[depth]
+            label = "setup" if depth is None else f"{depth + 1:5d}"
+            print(f"{label:>5s} | {counters['nodes']:5d} | {counters['candidates']:10d} | {counters['guesses scored']:14d} | "
+                  f"{counters['guesses pruned']:14d} | {counters['pattern evaluations']:13d} | " +
+                  " | ".join(f"{timers[name]:{len(name) + 4}.3f}" for name in phases))
+        print("=" * 50 + "\n")
+
+    def write_trace(self, path: str):
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, file)
+
+class WordleSolver:
+    # Word lists, the feedback matrix and the derived tables are all loaded on
+    # first use, so creating a solver (or importing this module) is cheap.
+    def __init__(self, guesses_file: str = 'lists/combined.txt', answers_file: str = 'lists/answers.txt',
+                 solved_file: str | None = None, cache_dir: str = 'lists', maxdepth: int = 6,
+                 workers: int = 1, chunk_size: int = 1024, serial_threshold: int = 200, strategy: str = 'buckets',
+                 exact_width: int = 0, beam_width: int = 0, beam_depth: int = 2, cache_size: int = 200000,
+                 opening_book: bool = False, hard_mode: bool = False, opener: str | None = None,
+                 profiler: Profiler | None = None):
+        self.guesses_file = guesses_file
+        self.answers_file = answers_file
+        self.solved_file = solved_file
+        self.cache_dir = cache_dir
+        self.maxdepth = maxdepth
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.serial_threshold = serial_threshold
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy}, expected one of {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.exact_width = exact_width
+        self.beam_width = beam_width
+        self.beam_depth = beam_depth
+        if hard_mode and (exact_width > 0 or beam_width > 0):
+            raise ValueError("Hard mode only supports the greedy search")
+        if beam_width > 0 and beam_depth < 1:
+            raise ValueError("Beam depth must be a positive integer")
+        # Every guess must be consistent with the feedback so far
+        self.hard_mode = hard_mode
+        # First guess to play instead of the best one, checked against the guess list on first use
+        self.opener = opener
+        self.worker_pool = None
+        self.shared_indices = None
+        self.shared_scores = None
+        # Results for candidate sets already seen, keyed by their bitset
+        self.cache = CandidateCache(cache_size)
+        # Whether recursive_check reads and writes the opening book in cache_dir
+        self.opening_book = opening_book
+        self.profiler = profiler
+
+    @cached_property
+    def all_words(self) -> list[str]:
+        return load_word_list(self.guesses_file)
+
+    @cached_property
+    def answer_words(self) -> list[str]:
+        # The feedback matrix covers every answer, including solved ones
+        answers = load_word_list(self.answers_file)
+        missing = sorted(set(answers) - set(self.all_words))
+        if missing:
+            raise ValueError(f"{len(missing)} answers are not in {self.guesses_file}, e.g. {missing[0]}")
+        return answers
+
+    @cached_property
+    def solved_words(self) -> set[str]:
+        return set(load_word_list(self.solved_file)) if self.solved_file else set()
+
+    @cached_property
+    def guess_index(self) -> dict[str, int]:
+        return {word: i for i, word in enumerate(self.all_words)}
+
+    @cached_property
+    def answer_index(self) -> dict[str, int]:
+        return {word: i for i, word in enumerate(self.answer_words)}
+
+    @cached_property
+    def guess_letters(self) -> np.ndarray:
+        return encode_words(self.all_words)
+
+    @cached_property
+    def answer_letters(self) -> np.ndarray:
+        return encode_words(self.answer_words)
+
+    @cached_property
+    def feedback(self) -> np.ndarray:
+        with self.profile('load feedback'):
+            return load_feedback_matrix(self.all_words, self.answer_words, self.cache_dir)
+
+    @cached_property
+    def word_rank(self) -> np.ndarray:
+        return np.argsort(np.argsort(self.all_words))
+
+    @cached_property
+    def answer_guess_index(self) -> np.ndarray:
+        return np.array([self.guess_index[word] for word in self.answer_words], dtype=INDEX_DTYPE)
+
+    @cached_property
+    def all_guesses(self) -> np.ndarray:
+        return np.arange(len(self.all_words), dtype=INDEX_DTYPE)
+
+    @cached_property
+    def root_answers(self) -> np.ndarray:
+        # The solver works on answer indices, words are only looked up for output
+        return np.array([i for i, word in enumerate(self.answer_words) if word not in self.solved_words],
+                        dtype=INDEX_DTYPE)
+
+    @cached_property
+    def letter_index(self) -> LetterIndex:
+        return LetterIndex(self.guess_letters)
+
+    @cached_property
+    def answer_letter_index(self) -> LetterIndex:
+        return LetterIndex(self.answer_letters)
+
+    @cached_property
+    def root_answer_mask(self) -> np.ndarray:
+        # root_answers as a packed bitmask over every answer
+        mask = np.zeros(len(self.answer_words), dtype=bool)
+        mask[self.root_answers] = True
+        return np.packbits(mask, bitorder='little')
+
+    @cached_property
+    def burner_indices(self) -> np.ndarray:
+        # The words that split the full answer list best
+        all_answers = np.arange(len(self.answer_words), dtype=INDEX_DTYPE)
+        scores = self.get_scores(self.all_guesses, all_answers, strategy_buckets)
+        return np.sort(np.argsort(-scores, kind='stable')[:BURNER_COUNT]).astype(INDEX_DTYPE)
+
+    @property
+    def worker_settings(self) -> dict:
+        # Everything a worker needs to pick the same guesses as this solver
+        return dict(guesses_file=self.guesses_file, answers_file=self.answers_file, cache_dir=self.cache_dir,
+                    maxdepth=self.maxdepth, strategy=self.strategy, exact_width=self.exact_width,
+                    beam_width=self.beam_width, beam_depth=self.beam_depth,
+                    cache_size=self.cache.max_entries, hard_mode=self.hard_mode, opener=self.opener)
+
+    def profile(self, phase: str, **details):
+        # Times a phase when profiling, otherwise costs next to nothing
+        return self.profiler.phase(phase, **details) if self.profiler else contextlib.nullcontext()
+
+    def count(self, name: str, value: int = 1):
+        if self.profiler:
+            self.profiler.count(name, value)
+
+    def __enter__(self):
+        # Shares one worker pool across every get_best_guess call until exit
+        if self.workers > 1:
+            # Build the matrix cache first so workers only ever load the file,
+            # and pick the fast path burners once for every worker
+            self.feedback
+            self.burner_indices
+            # Scan inputs and results are exchanged through shared arrays rather than pickled
+            shared_indices = multiprocessing.RawArray('H', len(self.all_words) + len(self.answer_words))
+            shared_scores = multiprocessing.RawArray('d', len(self.all_words))
+            self.shared_indices = np.frombuffer(shared_indices, dtype=INDEX_DTYPE)
+            self.shared_scores = np.frombuffer(shared_scores, dtype=np.float64)
+            with self.profile('pool startup', workers=self.workers):
+                self.worker_pool = multiprocessing.Pool(processes=self.workers, initializer=init_worker,
+                                                        initargs=(self.worker_settings, self.burner_indices,
+                                                                  shared_indices, shared_scores))
+                # Round-trip a task per worker so startup is timed here, not in the first scan
+                self.worker_pool.map(abs, range(self.workers), chunksize=1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.worker_pool is not None:
+            self.worker_pool.terminate()
+            self.worker_pool.join()
+            self.worker_pool = None
+            self.shared_indices = None
+            self.shared_scores = None
+
+    def get_pattern_histograms(self, guess_indices: np.ndarray, answer_indices: np.ndarray) -> np.ndarray:
+        # One row of PATTERN_COUNT bucket sizes per guess. Each guess's codes are
+        # offset into their own range so a single bincount builds every histogram.
+        self.count('guesses scored', len(guess_indices))
+        self.count('pattern evaluations', len(guess_indices) * len(answer_indices))
+        patterns = self.feedback[np.ix_(guess_indices, answer_indices)].astype(np.int64)
+        patterns += np.arange(len(guess_indices), dtype=np.int64)[:, None] * PATTERN_COUNT
+        counts = np.bincount(patterns.ravel(), minlength=len(guess_indices) * PATTERN_COUNT)
+        return counts.reshape(len(guess_indices), PATTERN_COUNT)
+
+    def get_scores(self, guess_indices: np.ndarray, answer_indices: np.ndarray, strategy=None,
+                   block_size: int = 2048) -> np.ndarray:
+        # Scores every guess with the solver's strategy unless another is given
+        strategy = strategy or STRATEGIES[self.strategy]
+        is_candidate = np.isin(guess_indices, self.answer_guess_index[answer_indices])
+        scores = np.empty(len(guess_indices), dtype=np.float64)
+
+        # Score in blocks to keep the int64 pattern copy small at the root
+        for start in range(0, len(guess_indices), block_size):
+            histograms = self.get_pattern_histograms(guess_indices[start:start + block_size], answer_indices)
+            scores[start:start + block_size] = strategy(histograms, is_candidate[start:start + block_size],
+                                                        len(answer_indices))
+        return scores
+
+    def get_bucket_bounds(self, guess_indices: np.ndarray, answer_indices: np.ndarray) -> np.ndarray:
+        # Each letter of a guess can only come back in the colours some candidate
+        # allows at that position: G if a candidate has it there, Y if one has it
+        # elsewhere, B unless every candidate has it there. The product of those
+        # counts bounds the buckets without touching the feedback matrix.
+        letters = self.answer_letters[answer_indices]
+        at = np.zeros((5, 256), dtype=np.int64)
+        for i in range(5):
+            at[i] = np.bincount(letters[:, i], minlength=256)
+        elsewhere = at.sum(axis=0) - at
+        guess_letters = self.guess_letters[guess_indices]
+        positions = np.arange(5)
+        colours = ((at[positions, guess_letters] > 0).astype(np.int64)
+                   + (elsewhere[positions, guess_letters] > 0)
+                   + (at[positions, guess_letters] < len(answer_indices)))
+        return np.minimum(colours.prod(axis=1), len(answer_indices))
+
+    def scan_guesses(self, guess_indices: np.ndarray, answer_indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Branch and bound: scores guesses in blocks, highest bound first, and
+        # stops once no remaining bound can reach the best score. Returns the
+        # guesses that were scored with their scores. A skipped guess scores
+        # strictly lower than the best, so it could not have won a tie either.
+        is_candidate = np.isin(guess_indices, self.answer_guess_index[answer_indices])
+        bounds = STRATEGY_BOUNDS[self.strategy](self.get_bucket_bounds(guess_indices, answer_indices),
+                                                is_candidate, len(answer_indices))
+        order = np.argsort(-bounds, kind='stable')
+        guess_indices, bounds = guess_indices[order], bounds[order]
+
+        block_size = max(SCAN_BLOCK_SIZE, self.chunk_size * self.workers if self.worker_pool else 0)
+        scores = []
+        best = -np.inf
+        scored = 0
+        while scored < len(guess_indices) and bounds[scored] >= best - 1e-9:
+            block = guess_indices[scored:scored + block_size]
+            scores.append(self.score_guesses(block, answer_indices))
+            best = max(best, scores[-1].max())
+            scored += len(block)
+        self.count('guesses pruned', len(guess_indices) - scored)
+        return guess_indices[:scored], np.concatenate(scores)
+
+    def get_perfect_splits(self, guess_indices: np.ndarray, answer_indices: np.ndarray) -> np.ndarray:
+        # The guesses that put every candidate in its own bucket
+        histograms = self.get_pattern_histograms(guess_indices, answer_indices)
+        return guess_indices[np.count_nonzero(histograms, axis=1) == len(answer_indices)]
+
+    def get_fast_path_guess(self, guess_indices: np.ndarray, answer_indices: np.ndarray):
+        # A guess that puts every candidate in its own bucket can't be beaten, so
+        # tiny buckets try the candidates and a shortlist of burners first.
+        allowed = np.zeros(len(self.all_words), dtype=bool)
+        allowed[guess_indices] = True
+
+        # Every strategy ranks a perfect split first, and perfect candidates
+        # above perfect non-candidates, so only the tie-break is left
+        candidates = self.answer_guess_index[answer_indices]
+        for guesses in (candidates[allowed[candidates]], self.burner_indices[allowed[self.burner_indices]]):
+            perfect = self.get_perfect_splits(guesses, answer_indices)
+            if len(perfect) > 0:
+                return self.pick_best_guess(np.zeros(len(perfect)), perfect)
+
+        return None
+
+    def score_guesses(self, guess_indices: np.ndarray, answer_indices: np.ndarray) -> np.ndarray:
+        # Small candidate sets are cheaper to score here than to ship to workers
+        if self.worker_pool is None or len(answer_indices) < self.serial_threshold:
+            return self.get_scores(guess_indices, answer_indices)
+
+        # The guesses and candidates go into the shared index array once, then
+        # each task only carries the offsets of its block
+        self.count('guesses scored', len(guess_indices))
+        self.count('pattern evaluations', len(guess_indices) * len(answer_indices))
+        guess_count, answer_count = len(guess_indices), len(answer_indices)
+        self.shared_indices[:guess_count] = guess_indices
+        self.shared_indices[guess_count:guess_count + answer_count] = answer_indices
+        tasks = [(start, min(start + self.chunk_size, guess_count), guess_count, answer_count)
+                 for start in range(0, guess_count, self.chunk_size)]
+        with self.profile('pool dispatch', tasks=len(tasks)):
+            self.worker_pool.starmap(score_guess_block, tasks, chunksize=1)
+        return self.shared_scores[:guess_count].copy()
+
+    def pick_best_guess(self, scores: np.ndarray, guess_indices: np.ndarray) -> int:
+        # Highest score wins, ties go to the alphabetically last word
+        tied = guess_indices[scores == scores.max()]
+        return tied[np.argmax(self.word_rank[tied])]
+
+    def reduce_guesses(self, possible_guesses: np.ndarray, possible_answers: np.ndarray) -> np.ndarray:
+        # Letters that appear in no candidate always come back B wherever they
+        # are, so guesses that agree on every other letter split the candidates
+        # identically. Keep every candidate (it can still win) and one
+        # non-candidate per class, the alphabetically last one, which is the one
+        # pick_best_guess would choose anyway. Guesses with no candidate letters
+        # at all can't split anything and are dropped.
+        present = np.zeros(256, dtype=bool)
+        present[self.answer_letters[possible_answers]] = True
+        letters = self.guess_letters[possible_guesses]
+        masked = np.where(present[letters], letters, 0).astype(np.int64)
+        keys = (masked << np.arange(0, 40, 8, dtype=np.int64)).sum(axis=1)
+
+        is_candidate = np.isin(possible_guesses, self.answer_guess_index[possible_answers])
+        others = np.flatnonzero(~is_candidate & (keys != 0))
+        order = others[np.lexsort((self.word_rank[possible_guesses[others]], keys[others]))]
+        last_of_class = np.append(keys[order][1:] != keys[order][:-1], len(order) > 0)[:len(order)]
+
+        keep = is_candidate.copy()
+        keep[order[last_of_class]] = True
+        return possible_guesses[keep]
+
+    def get_best_guess(self, possible_guesses : np.ndarray, possible_answers : np.ndarray) -> int:
+        # Takes guess and answer indices, returns the index of the best guess
+        if len(possible_answers) == 0:
+            raise ValueError("No possible answers")
+
+        if len(possible_answers) == 1:
+            return int(self.answer_guess_index[possible_answers[0]])
+
+        if len(possible_answers) <= FAST_PATH_SIZE:
+            with self.profile('fast path'):
+                best_guess = self.get_fast_path_guess(possible_guesses, possible_answers)
+            if best_guess is not None:
+                return int(best_guess)
+
+        with self.profile('reduce'):
+            possible_guesses = self.reduce_guesses(possible_guesses, possible_answers)
+        with self.profile('score', guesses=len(possible_guesses)):
+            possible_guesses, scores = self.scan_guesses(possible_guesses, possible_answers)
+        return int(self.pick_best_guess(scores, possible_guesses))
+
+    def partition_answers(self, guess: int, possible_answers: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Stable sort of the answers by pattern code. Bucket `code` is
+        # grouped[offsets[code]:offsets[code + 1]], in the original answer order.
+        codes = self.feedback[guess, possible_answers]
+        grouped = possible_answers[np.argsort(codes, kind='stable')]
+        offsets = np.zeros(PATTERN_COUNT + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=PATTERN_COUNT), out=offsets[1:])
+        return grouped, offsets
+
+    def check_answers_against_guess(self, guess: int, possible_answers: np.ndarray) -> dict[int, np.ndarray]:
+        # Buckets keyed by pattern code, each a view into one grouped array
+        grouped, offsets = self.partition_answers(guess, possible_answers)
+        results = {}
+        for code in np.flatnonzero(offsets[1:] > offsets[:-1]).tolist():
+            results[code] = grouped[offsets[code]:offsets[code + 1]]
+        return results
+
+    def format_path(self, path: tuple) -> str:
+        # Paths alternate guess index and pattern code, e.g. " trace BBBBB soily BBBBB"
+        return ''.join(f" {self.all_words[guess]} {code_to_pattern(code)}" for guess, code in zip(path[::2], path[1::2]))
+
+    def get_candidate_key(self, possible_answers: np.ndarray) -> int:
+        # The candidate set as a bitset over answer indices, independent of the
+        # order or path it was reached by. Python ints hash in one pass.
+        mask = np.zeros(len(self.answer_words), dtype=bool)
+        mask[possible_answers] = True
+        return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+    def get_ordered_guesses(self, possible_answers: np.ndarray, width: int) -> np.ndarray:
+        # The `width` best guesses by the solver's strategy, best first
+        guesses = self.reduce_guesses(self.all_guesses, possible_answers)
+        scores = self.get_scores(guesses, possible_answers)
+        order = np.lexsort((-self.word_rank[guesses], -scores))[:width]
+        return guesses[order]
+
+    def solve_exact(self, possible_answers: np.ndarray, guesses_left: int, budget: float = NO_SOLUTION) -> tuple[float, int]:
+        # Returns (total guesses to solve every candidate, guess to play), only
+        # searching for totals below budget. If none is found the result is a
+        # lower bound of at least budget and the guess is -1.
+        n = len(possible_answers)
+        if n == 1:
+            return 1, int(self.answer_guess_index[possible_answers[0]])
+        if guesses_left <= 1:
+            return NO_SOLUTION, -1
+        if n == 2:
+            return 3, int(self.pick_best_guess(np.zeros(2), self.answer_guess_index[possible_answers]))
+
+        # Best case: guess a candidate and split the rest into singles
+        lower_bound = 2 * n - 1
+        key = ('exact', guesses_left, self.get_candidate_key(possible_answers))
+        entry = self.cache.get(key)
+        if entry is not None:
+            cost, guess = entry
+            if guess >= 0 or cost >= budget:
+                return cost, guess
+            lower_bound = max(lower_bound, cost)
+        if lower_bound >= budget:
+            return lower_bound, -1
+
+        best_cost, best_guess = budget, -1
+        for guess in self.get_ordered_guesses(possible_answers, self.exact_width).tolist():
+            grouped, offsets = self.partition_answers(guess, possible_answers)
+            sizes = np.diff(offsets)
+            sizes[ALL_GREEN] = 0
+            codes = np.flatnonzero(sizes)
+            if len(codes) == 1 and sizes[codes[0]] == n:
+                continue
+
+            # Start from the bucket lower bounds and tighten them largest first,
+            # dropping the guess as soon as it can't beat the best so far
+            bounds = np.where(sizes[codes] == 1, 1, 2 * sizes[codes] - 1)
+            total = n + int(bounds.sum())
+            for i in np.argsort(-sizes[codes], kind='stable').tolist():
+                if total >= best_cost:
+                    break
+                code = codes[i]
+                cost, _ = self.solve_exact(grouped[offsets[code]:offsets[code + 1]], guesses_left - 1,
+                                           best_cost - total + bounds[i])
+                total += cost - bounds[i]
+
+            if total < best_cost:
+                best_cost, best_guess = total, guess
+                if best_cost == lower_bound:
+                    break
+
+        self.cache.put(key, (best_cost, best_guess))
+        return best_cost, best_guess
+
+    def solve_beam(self, possible_answers: np.ndarray, lookahead: int) -> tuple[float, int]:
+        # Returns (estimated total guesses, guess to play). Tries the beam_width
+        # best guesses by the strategy and looks `lookahead` guesses ahead, below
+        # which a bucket of n is assumed to take its lower bound of 2n-1.
+        n = len(possible_answers)
+        if n == 1:
+            return 1, int(self.answer_guess_index[possible_answers[0]])
+        if lookahead <= 0:
+            return 2 * n - 1, -1
+
+        key = ('beam', lookahead, self.get_candidate_key(possible_answers))
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+
+        best_cost, best_guess = NO_SOLUTION, -1
+        for guess in self.get_ordered_guesses(possible_answers, self.beam_width).tolist():
+            grouped, offsets = self.partition_answers(guess, possible_answers)
+            total = n
+            for code in np.flatnonzero(np.diff(offsets)).tolist():
+                if code != ALL_GREEN:
+                    total += self.solve_beam(grouped[offsets[code]:offsets[code + 1]], lookahead - 1)[0]
+            if total < best_cost:
+                best_cost, best_guess = total, guess
+
+        self.cache.put(key, (best_cost, best_guess))
+        return best_cost, best_guess
+
+    def get_hard_mode_guesses(self, possible_guesses: np.ndarray, guess: int, code: int) -> np.ndarray:
+        # The guesses still allowed in hard mode after `guess` came back as `code`
+        mask = self.letter_index.unpack(self.letter_index.consistent(self.guess_letters[guess], code))
+        return possible_guesses[mask[possible_guesses]]
+
+    def select_guess(self, possible_answers: np.ndarray, depth: int, possible_guesses: np.ndarray | None = None) -> int:
+        # The guess recursive_check plays for a node at this depth, from every
+        # guess unless hard mode narrowed them down
+        if len(possible_answers) == 1:
+            return int(self.answer_guess_index[possible_answers[0]])
+
+        if self.exact_width > 0:
+            with self.profile('exact'):
+                cost, guess = self.solve_exact(possible_answers, self.maxdepth - depth)
+            if guess >= 0:
+                return guess
+
+        if self.beam_width > 0:
+            with self.profile('beam'):
+                cost, guess = self.solve_beam(possible_answers, self.beam_depth)
+            if guess >= 0:
+                return guess
+
+        # The same candidate set can be reached by several paths, but in hard
+        # mode each path allows its own guesses
+        key = ('greedy', self.get_candidate_key(possible_answers))
+        if possible_guesses is None:
+            possible_guesses = self.all_guesses
+        else:
+            key += (possible_guesses.tobytes(),)
+        guess = self.cache.get(key)
+        if guess is None:
+            guess = self.get_best_guess(possible_guesses, possible_answers)
+            self.cache.put(key, guess)
+        return guess
+
+    def prefetch_guesses(self, groups: dict[tuple, np.ndarray], depth: int,
+                         allowed: dict[tuple, np.ndarray]) -> dict[tuple, int]:
+        # Solves the small nodes of a layer as one pool task each. Tasks go out
+        # largest first and come back in any order, so workers share many small
+        # buckets at once, while big nodes are left to select_guess, which
+        # splits their guesses across the pool instead. The exact search at the
+        # root already fills the cache for most nodes below it, so it keeps
+        # everything in this process.
+        if self.worker_pool is None or self.exact_width > 0:
+            return {}
+        small = sorted((group for group, answers in groups.items() if 1 < len(answers) < self.serial_threshold),
+                       key=lambda group: len(groups[group]), reverse=True)
+        tasks = [(task_id, groups[group], allowed.get(group), depth, self.profiler is not None)
+                 for task_id, group in enumerate(small)]
+        guesses = {}
+        with self.profile('pool dispatch', tasks=len(tasks)):
+            chunk_size = max(1, len(tasks) // (self.workers * 8))
+            for task_id, guess, counters in self.worker_pool.imap_unordered(select_node_guess, tasks, chunksize=chunk_size):
+                guesses[small[task_id]] = guess
+                # Work done in workers counts towards the layer it was done for
+                for name, value in (counters or {}).items():
+                    self.count(name, value)
+        return guesses
+
+    @cached_property
+    def opening_book_path(self) -> str:
+        # The first two guesses only depend on the lists, the answers still in
+        # play, the settings that pick guesses and the selection code itself,
+        # so the book is named after them
+        digest = hashlib.sha256(get_list_hash(self.all_words, self.answer_words).encode('ascii'))
+        digest.update(self.root_answers.tobytes())
+        digest.update(f"{OPENING_BOOK_VERSION}:{FAST_PATH_SIZE}:{BURNER_COUNT}:".encode('ascii'))
+        digest.update(f"{self.strategy}:{self.maxdepth}:{self.exact_width}:{self.beam_width}:{self.beam_depth}:{self.hard_mode}:{self.opener}".encode('ascii'))
+        return os.path.join(self.cache_dir, f"opening-{digest.hexdigest()[:16]}.json")
+
+    def load_opening_book(self) -> dict[tuple, int] | None:
+        # Guesses keyed by the same paths recursive_check uses: () for the
+        # opener and (opener, pattern code) for each reply
+        try:
+            with open(self.opening_book_path) as file:
+                data = json.load(file)
+            opener = self.guess_index[data['guess']]
+            book = {(): opener}
+            for pattern, reply in data['replies'].items():
+                book[(opener, pattern_to_code(pattern))] = self.guess_index[reply]
+            return book
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save_opening_book(self, book: dict[tuple, int]):
+        data = {'strategy': self.strategy, 'guess': self.all_words[book[()]],
+                'replies': {code_to_pattern(path[1]): self.all_words[guess] for path, guess in book.items() if path}}
+        temp_path = f"{self.opening_book_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(data, file, indent=2)
+        os.replace(temp_path, self.opening_book_path)
+
+    def get_previous_answers(self, previous: DecisionTree) -> np.ndarray:
+        # Answer indices a previous tree was built for, sorted like root_answers
+        words = previous.solved_words()
+        missing = [word for word in words if word not in self.answer_index]
+        if missing:
+            raise ValueError(f"Previous tree solves words missing from the answers list: {', '.join(missing[:5])}")
+        return np.array(sorted(self.answer_index[word] for word in words), dtype=INDEX_DTYPE)
+
+    def recursive_check(self, previous: DecisionTree | None = None) -> DecisionTree:
+        # With a previous tree, nodes whose answers did not change keep their old
+        # guess, so only the branches that lost answers get searched again
+        previous_nodes = {(): (0, self.get_previous_answers(previous))} if previous else {}
+        reused = 0
+
+        # The opening book replaces the two most expensive layers
+        book = self.load_opening_book() if self.opening_book else None
+        if book:
+            print(f"Using opening book {self.opening_book_path}")
+
+        # Each layer maps a path of (guess, pattern) pairs to the answer indices still possible
+        layers : list[dict[tuple, np.ndarray]] = []
+        solved_data = [0] * (self.maxdepth + 1)  # Initialize with zeros for each depth
+        for i in range(self.maxdepth + 1):
+            layers.append({})
+        layers[0][()] = self.root_answers
+
+        # Tree nodes in the order they are created, indexed through node_ids
+        node_ids = {(): 0}
+        node_guesses = [-1]
+        node_edges = [[]]
+        # Guesses each node may play in hard mode, keyed like the layers
+        allowed = {(): self.all_guesses} if self.hard_mode else {}
+
+        for d in range(self.maxdepth):
+            if self.profiler:
+                self.profiler.depth = d
+            # Nodes that keep their guess from the previous tree
+            layer_guesses = {}
+            for group in layers[d].keys() & previous_nodes.keys():
+                previous_node, previous_answers = previous_nodes[group]
+                previous_guess = previous.guess(previous_node)
+                if previous_guess not in self.guess_index or not np.array_equal(previous_answers, layers[d][group]):
                     continue
-                key = f"{group} {best_guess} {result}"
-                layers[d+1][key] = next_layer[result]
-    
-    # Calculate statistics
-    total_solved = sum(solved_data)
-    total_answers = total_solved + (sum(len(group) for group in layers[maxdepth].values()) if maxdepth < len(layers) - 1 else 0)
+                if not self.hard_mode or self.guess_index[previous_guess] in allowed[group]:
+                    layer_guesses[group] = self.guess_index[previous_guess]
+            reused += len(layer_guesses)
+            if d == 0 and self.opener:
+                if self.opener not in self.guess_index:
+                    raise ValueError(f"Opener {self.opener} is not in {self.guesses_file}")
+                layer_guesses[()] = self.guess_index[self.opener]
+            if book:
+                layer_guesses.update({group: book[group] for group in layers[d].keys() - layer_guesses.keys()
+                                      if group in book})
+            layer_guesses.update(self.prefetch_guesses(
+                {group: answers for group, answers in layers[d].items() if group not in layer_guesses}, d, allowed))
+
+            for group in layers[d].keys():
+                node = node_ids[group]
+                self.count('nodes')
+                self.count('candidates', len(layers[d][group]))
+                previous_node, previous_answers = previous_nodes.get(group, (None, None))
+                previous_guess = previous.guess(previous_node) if previous_node is not None else None
+                best_guess = layer_guesses.get(group)
+                if best_guess is None:
+                    with self.profile('select', candidates=len(layers[d][group])):
+                        best_guess = self.select_guess(layers[d][group], d, allowed.get(group))
+                node_guesses[node] = best_guess
+                with self.profile('partition'):
+                    next_layer = self.check_answers_against_guess(best_guess, layers[d][group])
+                # Children of the old node stay comparable as long as the guess is the same
+                previous_layer = {}
+                if previous_guess is not None and previous_guess == self.all_words[best_guess]:
+                    previous_layer = self.check_answers_against_guess(best_guess, previous_answers)
+                for result in next_layer.keys():
+                    if result == ALL_GREEN:
+                        print(f"Solution for {self.answer_words[next_layer[result][0]]}:{self.format_path(group)} {self.all_words[best_guess]}")
+                        solved_data[d] += 1
+                        node_edges[node].append((result, TREE_SOLVED))
+                        continue
+                    key = group + (best_guess, result)
+                    layers[d+1][key] = next_layer[result]
+                    if self.hard_mode:
+                        allowed[key] = self.get_hard_mode_guesses(allowed[group], best_guess, result)
+                    if result in previous_layer:
+                        previous_nodes[key] = (previous.child(previous_node, result), previous_layer[result])
+                    node_ids[key] = len(node_guesses)
+                    node_edges[node].append((result, len(node_guesses)))
+                    node_guesses.append(-1)
+                    node_edges.append([])
+
+            # Record the first two layers the first time they are solved from scratch
+            if d == 1 and self.opening_book and book is None and previous is None:
+                self.save_opening_book({group: node_guesses[node_ids[group]] for layer in layers[:2] for group in layer})
+                print(f"Opening book written to {self.opening_book_path}")
     
-    print("\n=== Solver Statistics ===")
-    print(f"Total answers: {total_answers}")
-    print(f"Total solved: {total_solved} ({total_solved/total_answers*100:.2f}%)")
+        # Calculate statistics
+        total_solved = sum(solved_data)
+        total_answers = total_solved + sum(len(group) for group in layers[self.maxdepth].values())
     
-    # Calculate and print average depth
-    depth_sum = sum(depth * count for depth, count in enumerate(solved_data, 1))
-    avg_depth = depth_sum / total_solved if total_solved > 0 else 0
-    print(f"Average depth: {avg_depth:.2f}")
+        print("\n=== Solver Statistics ===")
+        print(f"Total answers: {total_answers}")
+        print(f"Total solved: {total_solved} ({total_solved/total_answers*100:.2f}%)")
     
-    # Print solved by depth
-    print("\nSolved by depth:")
-    print("Depth | Count  | % of Total | % of Solved | Cumul. %")
-    print("------|--------|------------|-------------|----------")
-    cumulative_solved = 0
-    for depth in range(1, maxdepth + 1):
-        count = solved_data[depth - 1] if depth - 1 < len(solved_data) else 0
-        cumulative_solved += count
-        print(f"{depth:5d} | {count:6d} | {count/total_answers*100:9.2f}% | {count/total_solved*100:10.2f}% | {cumulative_solved/total_answers*100:7.2f}%")
+        # Calculate and print average depth
+        depth_sum = sum(depth * count for depth, count in enumerate(solved_data, 1))
+        avg_depth = depth_sum / total_solved if total_solved > 0 else 0
+        print(f"Average depth: {avg_depth:.2f}")
     
-    if len(layers[maxdepth]) > 0:
-        unsolved_answers = 0
-        print("Unsolved answers:")
-        for key in layers[maxdepth + 1].keys():
-            for answer in layers[maxdepth + 1][key]:
-                print(f"  {key}: {answer}")
-                unsolved_answers += 1
-        print(f"Total unsolved answers: {unsolved_answers}")
+        # Print solved by depth
+        print("\nSolved by depth:")
+        print("Depth | Count  | % of Total | % of Solved | Cumul. %")
+        print("------|--------|------------|-------------|----------")
+        cumulative_solved = 0
+        for depth in range(1, self.maxdepth + 1):
+            count = solved_data[depth - 1] if depth - 1 < len(solved_data) else 0
+            cumulative_solved += count
+            print(f"{depth:5d} | {count:6d} | {count/total_answers*100:9.2f}% | {count/total_solved*100:10.2f}% | {cumulative_solved/total_answers*100:7.2f}%")
     
-    print("=" * 50 + "\n")
+        if len(layers[self.maxdepth]) > 0:
+            unsolved_answers = 0
+            print("Unsolved answers:")
+            for key in layers[self.maxdepth].keys():
+                for answer in layers[self.maxdepth][key]:
+                    print(f"  {self.format_path(key)}: {self.answer_words[answer]}")
+                    unsolved_answers += 1
+            print(f"Total unsolved answers: {unsolved_answers}")
+
+        if previous:
+            node_count = sum(len(layers[depth]) for depth in range(self.maxdepth))
+            print(f"Reused {reused} of {node_count} guesses from the previous tree")
+
+        print("=" * 50 + "\n")
+
+        if self.profiler:
+            self.profiler.depth = None
+            self.profiler.print_summary()
+            print(f"Cache: {len(self.cache)} entries, {self.cache.hits} hits, {self.cache.misses} misses")
+
+        return DecisionTree.from_nodes(node_guesses, node_edges, self.guess_letters)
+
+    def get_answer_mask(self, guess: str, pattern: str) -> np.ndarray:
+        # Packed mask of the answers that give this guess this pattern. Listed
+        # guesses read their feedback row, any other word uses the letter index.
+        code = pattern_to_code(pattern)
+        if guess in self.guess_index:
+            return np.packbits(self.feedback[self.guess_index[guess]] == code, bitorder='little')
+        if code not in get_attainable_codes(guess):
+            return np.zeros_like(self.root_answer_mask)
+        return self.answer_letter_index.consistent(encode_words([guess])[0], code)
+
+    def filter_answers(self, history: list[tuple[str, str]]) -> np.ndarray:
+        # Answer indices consistent with every (guess, pattern) pair in the
+        # history, one AND of packed masks per pair
+        mask = self.root_answer_mask.copy()
+        for guess, pattern in history:
+            mask &= self.get_answer_mask(guess, pattern)
+        return np.flatnonzero(self.answer_letter_index.unpack(mask)).astype(INDEX_DTYPE)
+
+    def play(self, tree: DecisionTree, answer: int) -> tuple[list[tuple[str, str]], bool]:
+        # Plays an answer index through the tree, returning the (guess, pattern)
+        # history and whether the tree solved it
+        history = []
+        node = 0
+        while node != TREE_SOLVED:
+            guess = tree.guess(node)
+            if guess is None:
+                return history, False
+            code = int(self.feedback[self.guess_index[guess], answer])
+            history.append((guess, code_to_pattern(code)))
+            node = tree.child(node, code)
+        return history, True
+
+    def filter_guesses(self, history: list[tuple[str, str]]) -> np.ndarray:
+        # Guess indices consistent with every pair in the history, which are
+        # the guesses hard mode still allows
+        mask = np.full(self.letter_index.at.shape[-1], 0xFF, dtype=np.uint8)
+        for guess, pattern in history:
+            if pattern_to_code(pattern) not in get_attainable_codes(guess):
+                mask[:] = 0
+                break
+            mask &= self.letter_index.consistent(encode_words([guess])[0], pattern_to_code(pattern))
+        return np.flatnonzero(self.letter_index.unpack(mask)).astype(INDEX_DTYPE)
+
+    def query_next_guess(self, tree: DecisionTree, history: list[tuple[str, str]]) -> str | None:
+        # Walks the tree along the history, one edge lookup per guess
+        node = 0
+        for guess, pattern in history:
+            if node is None or node == TREE_SOLVED or tree.guess(node) != guess:
+                node = None
+                break
+            node = tree.child(node, pattern_to_code(pattern))
+        if node is not None and node != TREE_SOLVED and tree.guess(node) is not None:
+            return tree.guess(node)
+
+        # The history left the tree, so solve the remaining candidates live
+        possible_answers = self.filter_answers(history)
+        if len(possible_answers) == 0:
+            return None
+        possible_guesses = self.filter_guesses(history) if self.hard_mode else self.all_guesses
+        return self.all_words[self.get_best_guess(possible_guesses, possible_answers)]
+
+def parse_history(tokens: list[str]) -> list[tuple[str, str]]:
+    # Tokens alternate guess and pattern, e.g. ["trace", "BYBBY", "sinew", "BBBGB"]
+    if len(tokens) % 2 != 0:
+        raise ValueError("history must alternate guesses and patterns")
+    history = []
+    for guess, pattern in zip(tokens[::2], tokens[1::2]):
+        guess, pattern = guess.lower(), pattern.upper()
+        if len(guess) != 5 or not guess.isalpha():
+            raise ValueError(f"{guess} is not a 5 letter word")
+        if len(pattern) != 5 or any(colour not in PATTERN_COLOURS for colour in pattern):
+            raise ValueError(f"{pattern} is not a pattern of 5 B/Y/G letters")
+        if pattern_to_code(pattern) not in get_attainable_codes(guess):
+            raise ValueError(f"{guess} can never score {pattern}")
+        history.append((guess, pattern))
+    return history
+
+def run_query(solver: WordleSolver, tree_file: str, tokens: list[str]):
+    # Only histories that leave the tree make the solver load its lists
+    try:
+        tree = DecisionTree.load(tree_file)
+    except Exception as e:
+        print(f"Error loading query tree: {e}")
+        sys.exit(1)
+
+    # With no history on the command line, answer one history per line of stdin
+    lines = [' '.join(tokens)] if tokens else sys.stdin
+    for line in lines:
+        try:
+            next_guess = solver.query_next_guess(tree, parse_history(line.split()))
+        except ValueError as e:
+            print(f"Error: {e}", flush=True)
+            continue
+        print(next_guess if next_guess else "No possible answers", flush=True)
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Wordle Solver')
@@ -135,6 +1231,42 @@ def parse_arguments():
                       help='File containing test answers to override the default answers list')
     parser.add_argument('-solved', '--solved-answers', dest='solved_answers_file',
                       help='File containing already solved answers to remove from the answers list')
+    parser.add_argument('-workers', '--workers', type=int,
+                      help='Number of worker processes, 1 disables the pool (default: $WORDLE_WORKERS or CPU count)')
+    parser.add_argument('-chunksize', '--chunk-size', dest='chunk_size', type=int, default=1024,
+                      help='Guesses scored per worker task (default: 1024)')
+    parser.add_argument('-serial', '--serial-threshold', dest='serial_threshold', type=int, default=200,
+                      help='Score nodes with fewer candidates than this without the pool (default: 200)')
+    parser.add_argument('-strategy', '--strategy', choices=list(STRATEGIES), default='buckets',
+                      help='How guesses are scored (default: buckets)')
+    parser.add_argument('-exact', '--exact-width', dest='exact_width', type=int, default=0,
+                      help='Minimise total guesses exactly over the N best guesses at each node (default: 0, off)')
+    parser.add_argument('-beam', '--beam-width', dest='beam_width', type=int, default=0,
+                      help='Look ahead over the N best guesses at each node and play the one with the lowest expected depth (default: 0, off)')
+    parser.add_argument('-beamdepth', '--beam-depth', dest='beam_depth', type=int, default=2,
+                      help='Guesses to look ahead in beam mode (default: 2)')
+    parser.add_argument('-profile', '--profile', action='store_true',
+                      help='Print per-depth counters and phase timings after solving')
+    parser.add_argument('-trace', '--trace-file', dest='trace_file',
+                      help='Write a Chrome trace of the solve to this file (implies -profile)')
+    parser.add_argument('-hard', '--hard-mode', dest='hard_mode', action='store_true',
+                      help='Only play guesses consistent with all earlier feedback (greedy search only)')
+    parser.add_argument('-opener', '--opener',
+                      help='Force this first guess instead of the best one')
+    parser.add_argument('-nobook', '--no-opening-book', dest='opening_book', action='store_false',
+                      help='Solve the first two guesses from scratch instead of using the opening book')
+    parser.add_argument('-cache', '--cache-size', dest='cache_size', type=int, default=200000,
+                      help='Maximum candidate sets kept in the result cache (default: 200000)')
+    parser.add_argument('-tree', '--tree-file', dest='tree_file',
+                      help='Write the solved decision tree to this binary file')
+    parser.add_argument('-json', '--json-file', dest='json_file',
+                      help='Write the solved decision tree to this JSON file')
+    parser.add_argument('-query', '--query-tree', dest='query_file',
+                      help='Print the next guess from this decision tree instead of solving')
+    parser.add_argument('-previous', '--previous-tree', dest='previous_file',
+                      help='Re-solve incrementally, keeping the guesses of this tree wherever its answers are unchanged')
+    parser.add_argument('history', nargs='*',
+                      help='Query history as guess/pattern pairs, e.g. trace BYBBY sinew BBBGB (default: read from stdin)')
     
     # Handle both -test-answers and -testanswers formats
     args, unknown = parser.parse_known_args()
@@ -146,46 +1278,104 @@ def parse_arguments():
     
     return args
 
-# Parse command line arguments
-args = parse_arguments()
+def save_tree(tree: DecisionTree, args):
+    if args.tree_file:
+        tree.save(args.tree_file)
+        print(f"Decision tree written to {args.tree_file}")
+    if args.json_file:
+        with open(args.json_file, 'w') as file:
+            json.dump(tree.to_json(), file)
+        print(f"Decision tree written to {args.json_file}")
 
-# Set max depth from arguments
-maxdepth = args.depth
-if maxdepth <= 0:
-    print("Error: Depth must be a positive integer")
-    sys.exit(1)
+def run():
+    # Parse command line arguments
+    args = parse_arguments()
 
-# Load word lists
-all_words = load_word_list('lists/combined.txt')
-answers = load_word_list('lists/answers.txt')
+    # Set max depth from arguments
+    if args.depth <= 0:
+        print("Error: Depth must be a positive integer")
+        sys.exit(1)
+
+    # A history only means something as a query
+    if args.history and not args.query_file:
+        print(f"Error: unexpected arguments {' '.join(args.history)}, a history needs -query")
+        sys.exit(1)
+
+    # Set worker pool sizing from arguments, then $WORDLE_WORKERS, then the CPU count
+    if args.workers is None:
+        try:
+            args.workers = int(os.environ.get('WORDLE_WORKERS') or 0) or os.cpu_count()
+        except ValueError:
+            args.workers = 0
+    if args.workers <= 0 or args.chunk_size <= 0:
+        print("Error: Workers and chunk size must be positive integers")
+        sys.exit(1)
+
+    # Hard mode restricts the guesses of every node, which only the greedy search tracks
+    if args.hard_mode and (args.exact_width > 0 or args.beam_width > 0):
+        print("Error: Hard mode can't be combined with -exact or -beam")
+        sys.exit(1)
+    if args.beam_width > 0 and args.beam_depth <= 0:
+        print("Error: Beam depth must be a positive integer")
+        sys.exit(1)
+
+    # Override answers with test answers if specified
+    solver = WordleSolver(answers_file=args.test_answers_file or 'lists/answers.txt',
+                          solved_file=args.solved_answers_file, maxdepth=args.depth, workers=args.workers,
+                          chunk_size=args.chunk_size, serial_threshold=args.serial_threshold, strategy=args.strategy,
+                          exact_width=args.exact_width, beam_width=args.beam_width,
+                          beam_depth=args.beam_depth, cache_size=args.cache_size, opening_book=args.opening_book,
+                          hard_mode=args.hard_mode, opener=args.opener,
+                          profiler=Profiler() if args.profile or args.trace_file else None)
+
+    if args.query_file:
+        run_query(solver, args.query_file, args.history)
+        return
 
-# Override answers with test answers if specified
-if args.test_answers_file:
     try:
-        answers = load_word_list(args.test_answers_file)
-        print(f"Loaded {len(answers)} test answers from {args.test_answers_file}")
+        answers = solver.answer_words
+        if args.test_answers_file:
+            print(f"Loaded {len(answers)} test answers from {args.test_answers_file}")
     except Exception as e:
-        print(f"Error loading test answers file: {e}")
+        print(f"Error loading {'test ' if args.test_answers_file else ''}answers file: {e}")
         sys.exit(1)
 
-# Remove solved answers if specified
-if args.solved_answers_file:
+    # Remove solved answers if specified
     try:
-        solved = set(load_word_list(args.solved_answers_file))
-        answers = [word for word in answers if word not in solved]
-        print(f"Removed {len(solved)} solved answers. Remaining: {len(answers)}")
+        if args.solved_answers_file:
+            print(f"Removed {len(solver.solved_words)} solved answers. Remaining: {len(solver.root_answers)}")
     except Exception as e:
         print(f"Error loading solved answers file: {e}")
         sys.exit(1)
+    if len(solver.root_answers) == 0:
+        print("Error: No possible answers")
+        sys.exit(1)
 
-# Print the number of words in the combined list
-print(f"Number of words in combined.txt: {len(all_words)}")
-print(f"Number of answer words: {len(answers)}")
+    if args.opener and args.opener not in solver.all_words:
+        print(f"Error: opener {args.opener} is not in combined.txt")
+        sys.exit(1)
 
-def run():
-    recursive_check()
-    #best_guess = get_best_guess(all_words, answers)
-    #print(f"Best guess: {best_guess}")
+    # Print the number of words in the combined list
+    print(f"Number of words in combined.txt: {len(solver.all_words)}")
+    print(f"Number of answer words: {len(solver.root_answers)}")
+
+    # Load the tree to update if specified
+    previous = None
+    if args.previous_file:
+        try:
+            previous = DecisionTree.load(args.previous_file)
+            print(f"Loaded previous tree for {len(solver.get_previous_answers(previous))} answers from {args.previous_file}")
+        except Exception as e:
+            print(f"Error loading previous tree: {e}")
+            sys.exit(1)
+
+    with solver:
+        tree = solver.recursive_check(previous)
+    save_tree(tree, args)
+
+    if args.trace_file:
+        solver.profiler.write_trace(args.trace_file)
+        print(f"Trace written to {args.trace_file}")
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()